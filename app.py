@@ -11,8 +11,16 @@ explanation of file: Flask web application entry point enforcing RBAC.
 """
 
 import os
+
+if os.environ.get("GEVENT") == "1":
+    # Patch blocking stdlib calls before Flask or sqlite3 are imported.
+    from gevent import monkey
+
+    monkey.patch_all()
+
+from concurrent.futures import Future
 from functools import wraps
-from typing import Callable, Optional
+from typing import Callable, FrozenSet, Optional
 
 from flask import (
     Flask,
@@ -23,7 +31,9 @@ from flask import (
     session,
     url_for,
 )
-from werkzeug.security import check_password_hash
+from flask_caching import Cache
+from jinja2 import FileSystemBytecodeCache
+from werkzeug.security import check_password_hash, generate_password_hash
 
 from forms import EmployeeForm, LoginForm, PayRaiseForm
 from models import (
@@ -33,15 +43,75 @@ from models import (
     get_employees,
     get_payraises_for_user,
     get_user_by_username,
+    release_connection,
 )
 
 # Initialize Flask application.
 app = Flask(__name__)
 
+# Persist compiled templates so restarts and sibling workers skip re-parsing.
+# The default directory is a per-user folder in the temp dir with 0700 permissions.
+app.jinja_options = {**app.jinja_options, "bytecode_cache": FileSystemBytecodeCache()}
+
+# Templates rendered on nearly every visit; loading them up front warms the cache.
+_HOT_TEMPLATES = ("base.html", "login.html", "home.html", "show_payraises.html")
+
 # Use os.environ explicitly per assignment requirement.
 app.secret_key = os.environ.get("FLASK_SECRET", "dev-secret-please-change")
 app.config["SESSION_COOKIE_HTTPONLY"] = True
 app.config["SESSION_PERMANENT"] = False
+app.config["SEND_FILE_MAX_AGE_DEFAULT"] = 31536000
+app.json.sort_keys = False
+
+# Short-lived cache for the read-only list pages. Only the decrypted records are
+# cached, never rendered pages, so flashes and per-session navigation stay live.
+# SimpleCache lives in each process: invalidate_list_caches() only clears the
+# worker that handled the write, so other Gunicorn workers may serve stale lists
+# until the timeout (60s employees, 30s pay raises). Point CACHE_TYPE at a shared
+# backend such as RedisCache if that window matters.
+cache = Cache(app, config={"CACHE_TYPE": "SimpleCache", "CACHE_DEFAULT_TIMEOUT": 30})
+_EMPLOYEES_CACHE_KEY = "list_employees"
+_PAYRAISES_CACHE_KEY = "list_payraises"
+
+# Checked against when a username is unknown so login timing does not reveal it.
+_DUMMY_HASH = generate_password_hash("invalid_placeholder_password")
+
+
+def invalidate_payraises_cache() -> None:
+    """
+    Drop the cached pay raise list after a pay raise write.
+    """
+    cache.delete(_PAYRAISES_CACHE_KEY)
+
+
+def invalidate_list_caches() -> None:
+    """
+    Drop cached list data after a write so the next view reads fresh records.
+    Keys are deleted one at a time because delete_many stops at the first key
+    that is missing, which would leave the rest cached.
+    """
+    cache.delete(_EMPLOYEES_CACHE_KEY)
+    invalidate_payraises_cache()
+
+
+def _after_payraise_write(future: Future) -> None:
+    """
+    Invalidate the cached pay raise list once a background insert has committed.
+    """
+    error = future.exception()
+    if error is not None:
+        app.logger.error("Pay raise insert failed: %s", error)
+        return
+    with app.app_context():
+        invalidate_payraises_cache()
+
+
+@app.teardown_appcontext
+def _release_db_connection(exception: Optional[BaseException]) -> None:
+    """
+    Hand the request's SQLite connection back to the pool.
+    """
+    release_connection()
 
 
 def login_required(view: Callable) -> Callable:
@@ -78,6 +148,24 @@ def requires_security_level(min_level: int) -> Callable:
     return decorator
 
 
+def requires_security_level_in(allowed: FrozenSet[int]) -> Callable:
+    """
+    Decorator enforcing that the logged-in user's security level is one of the allowed values.
+    """
+
+    def decorator(view: Callable) -> Callable:
+        @wraps(view)
+        def wrapped_view(*args, **kwargs):
+            if session.get("security_level") not in allowed:
+                flash("Page not found")
+                return render_template("error.html"), 404
+            return view(*args, **kwargs)
+
+        return wrapped_view
+
+    return decorator
+
+
 @app.route("/", methods=["GET", "POST"])
 @app.route("/login", methods=["GET", "POST"])
 def login():
@@ -96,7 +184,10 @@ def login():
             return render_template("login.html", form=form)
 
         user_row = get_user_by_username(form.username)
-        if user_row and check_password_hash(user_row["password_hash"], form.password):
+        # Always run the hash check so missing users take as long as real ones.
+        password_hash = user_row["password_hash"] if user_row else _DUMMY_HASH
+        password_ok = check_password_hash(password_hash, form.password)
+        if user_row and password_ok:
             session.clear()
             session["user_id"] = user_row["id"]
             session["username"] = user_row["username"]
@@ -137,16 +228,8 @@ def show_payraises():
     Display pay raises for the logged-in user with decrypted values.
     """
     user_id = session["user_id"]
+    # Display amounts are formatted during decryption in the model layer.
     raises = get_payraises_for_user(user_id)
-
-    # Format amounts for display while preserving encrypted storage.
-    for entry in raises:
-        try:
-            amount = float(entry["raise_amount"])
-            entry["raise_amount_display"] = f"${amount:,.2f}"
-        except (TypeError, ValueError):
-            entry["raise_amount_display"] = entry["raise_amount"]
-
     return render_template("show_payraises.html", raises=raises)
 
 
@@ -170,13 +253,21 @@ def add_payraise():
             flash("Page not found")
             return render_template("error.html"), 404
 
-        create_payraise(
-            user_id=session["user_id"],
-            emp_id=emp_id,
-            date_str=form.payraise_date,
-            raise_amt=float(form.raise_amount),
-            comments=form.comments if form.comments else None,
-        )
+        # References are checked up front; the insert completes in the background
+        # and the list caches clear once it commits.
+        try:
+            write = create_payraise(
+                user_id=session["user_id"],
+                emp_id=emp_id,
+                date_str=form.payraise_date,
+                raise_amt=float(form.raise_amount),
+                comments=form.comments if form.comments else None,
+            )
+        except ValueError as exc:
+            flash(str(exc))
+            flash("Record not added due to input errors.")
+            return redirect(url_for("result"))
+        write.add_done_callback(_after_payraise_write)
         flash("Record added")
         return redirect(url_for("result"))
 
@@ -205,6 +296,7 @@ def add_employee():
             department=form.department,
             security_level=form.security_level or 3,
         )
+        invalidate_list_caches()
         flash("Employee added successfully.")
         return redirect(url_for("result"))
 
@@ -213,37 +305,29 @@ def add_employee():
 
 @app.route("/list_employees")
 @login_required
-@requires_security_level(1)
+@requires_security_level_in(frozenset({1, 2}))
 def list_employees():
     """
     Display the list of employees to authorized users (security levels 1 and 2).
     """
-    if session.get("security_level") not in (1, 2):
-        flash("Page not found")
-        return render_template("error.html"), 404
-
-    employees = get_employees()
+    employees = cache.get(_EMPLOYEES_CACHE_KEY)
+    if employees is None:
+        employees = get_employees()
+        cache.set(_EMPLOYEES_CACHE_KEY, employees, timeout=60)
     return render_template("list_employees.html", employees=employees)
 
 
 @app.route("/list_payraises")
 @login_required
-@requires_security_level(2)
+@requires_security_level_in(frozenset({2}))
 def list_payraises():
     """
-    Display all pay raises to authorized users (security level >= 2).
+    Display all pay raises to authorized users (security level 2).
     """
-    if session.get("security_level") != 2:
-        flash("Page not found")
-        return render_template("error.html"), 404
-
-    payraises = get_all_payraises()
-    for entry in payraises:
-        try:
-            amount = float(entry["raise_amount"])
-            entry["raise_amount_display"] = f"${amount:,.2f}"
-        except (TypeError, ValueError):
-            entry["raise_amount_display"] = entry["raise_amount"]
+    payraises = cache.get(_PAYRAISES_CACHE_KEY)
+    if payraises is None:
+        payraises = get_all_payraises()
+        cache.set(_PAYRAISES_CACHE_KEY, payraises, timeout=30)
     return render_template("list_payraises.html", payraises=payraises)
 
 
@@ -273,7 +357,20 @@ def page_not_found(error):  # type: ignore[override]
     return render_template("error.html"), 404
 
 
+def _warm_templates() -> None:
+    """
+    Compile frequently rendered templates before the first request arrives.
+    """
+    for template_name in _HOT_TEMPLATES:
+        app.jinja_env.get_template(template_name)
+
+
+_warm_templates()
+
+
 if __name__ == "__main__":
     # Allow direct execution for local development convenience.
-    app.run(debug=True)
+    # The debugger and reloader are opt-in so they do not slow normal runs.
+    debug = os.environ.get("FLASK_DEBUG") == "1"
+    app.run(debug=debug, use_reloader=False)
 
@@ -7,24 +7,30 @@ Module 11: Build Role Based Access Control
 
 Due Sunday September 9
 
-explanation of file: Form dataclasses providing user input validation.
+explanation of file: Lightweight form classes providing user input validation.
 """
 
-from dataclasses import dataclass, field
 from typing import Mapping, Optional
 
 from utils import is_positive_number, is_valid_date
 
 
-@dataclass
 class LoginForm:
     """
     Simple container for login form data.
     """
 
-    username: str = ""
-    password: str = ""
-    errors: list[str] = field(default_factory=list)
+    __slots__ = ("username", "password", "errors")
+
+    def __init__(
+        self,
+        username: str = "",
+        password: str = "",
+        errors: Optional[list[str]] = None,
+    ) -> None:
+        self.username = username
+        self.password = password
+        self.errors = errors if errors is not None else []
 
     @classmethod
     def from_mapping(cls, data: Mapping[str, str]) -> "LoginForm":
@@ -41,16 +47,24 @@ class LoginForm:
         return cls(username=username, password=password, errors=errors)
 
 
-@dataclass
 class PayRaiseForm:
     """
     Validate the add pay raise submission.
     """
 
-    payraise_date: str = ""
-    raise_amount: str = ""
-    comments: str = ""
-    errors: list[str] = field(default_factory=list)
+    __slots__ = ("payraise_date", "raise_amount", "comments", "errors")
+
+    def __init__(
+        self,
+        payraise_date: str = "",
+        raise_amount: str = "",
+        comments: str = "",
+        errors: Optional[list[str]] = None,
+    ) -> None:
+        self.payraise_date = payraise_date
+        self.raise_amount = raise_amount
+        self.comments = comments
+        self.errors = errors if errors is not None else []
 
     @classmethod
     def from_mapping(cls, data: Mapping[str, str]) -> "PayRaiseForm":
@@ -75,17 +89,26 @@ class PayRaiseForm:
         )
 
 
-@dataclass
 class EmployeeForm:
     """
     Validate the add employee form submission.
     """
 
-    name: str = ""
-    email: str = ""
-    department: str = ""
-    security_level: Optional[int] = None
-    errors: list[str] = field(default_factory=list)
+    __slots__ = ("name", "email", "department", "security_level", "errors")
+
+    def __init__(
+        self,
+        name: str = "",
+        email: str = "",
+        department: str = "",
+        security_level: Optional[int] = None,
+        errors: Optional[list[str]] = None,
+    ) -> None:
+        self.name = name
+        self.email = email
+        self.department = department
+        self.security_level = security_level
+        self.errors = errors if errors is not None else []
 
     @classmethod
     def from_mapping(cls, data: Mapping[str, str]) -> "EmployeeForm":
@@ -0,0 +1,22 @@
+"""
+Betty Phipps
+
+11/08/2025
+
+Module 11: Build Role Based Access Control
+
+Due Sunday September 9
+
+explanation of file: Gunicorn settings for serving the portal with gevent workers.
+"""
+
+from multiprocessing import cpu_count
+
+# gevent lets a worker overlap network I/O across many requests, but not all work
+# here yields: password hashing on /login is CPU-bound, and SQLite calls, including
+# its busy-wait on a locked database, block in C. Any of those stalls every
+# greenlet in the worker, so keep per-worker concurrency modest and rely on
+# multiple processes for throughput.
+worker_class = "gevent"
+workers = 2 * cpu_count() + 1
+worker_connections = 50
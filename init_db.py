@@ -12,12 +12,14 @@ explanation of file: Database initialization and seeding script.
 
 import os
 import sqlite3
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Optional
 
 from cryptography.fernet import Fernet
 from werkzeug.security import generate_password_hash
 
-from utils import encrypt_text, get_project_root
+from utils import decrypt_text, encrypt_text, get_project_root, is_legacy_ciphertext
 
 
 def ensure_fernet_key(project_root: Path) -> bytes:
@@ -42,12 +44,56 @@ def ensure_fernet_key(project_root: Path) -> bytes:
     return key_bytes
 
 
+def _reencrypt(cipher: Optional[bytes]) -> Optional[bytes]:
+    """
+    Re-encrypt a legacy Fernet token with AES-GCM, leaving other values untouched.
+    """
+    if cipher is None or not is_legacy_ciphertext(cipher):
+        return cipher
+    return encrypt_text(decrypt_text(cipher))
+
+
+def migrate_legacy_ciphertexts(conn: sqlite3.Connection) -> int:
+    """
+    Rewrite pay raise fields still stored as Fernet tokens using AES-GCM.
+    Safe to run repeatedly; returns the number of rows rewritten.
+    """
+    cur = conn.execute(
+        """
+        SELECT id, payraise_date_encrypted, raiseamt_encrypted, comments_encrypted
+        FROM EmpPayRaise
+        """
+    )
+    updates = []
+    for row_id, *fields in cur.fetchall():
+        if any(field is not None and is_legacy_ciphertext(field) for field in fields):
+            updates.append((*(_reencrypt(field) for field in fields), row_id))
+
+    conn.executemany(
+        """
+        UPDATE EmpPayRaise
+        SET payraise_date_encrypted = ?, raiseamt_encrypted = ?, comments_encrypted = ?
+        WHERE id = ?
+        """,
+        updates,
+    )
+    return len(updates)
+
+
 def initialize_database(db_path: Path) -> None:
     """
     Create tables with the prescribed schema and seed initial records.
     """
     with sqlite3.connect(db_path) as conn:
-        conn.execute("PRAGMA foreign_keys = ON;")
+        conn.executescript(
+            """
+            PRAGMA foreign_keys = ON;
+            PRAGMA journal_mode=WAL;
+            PRAGMA mmap_size=268435456;
+            PRAGMA cache_size=-20000;
+            PRAGMA temp_store=MEMORY;
+            """
+        )
 
         # Create tables if they do not already exist.
         conn.executescript(
@@ -80,6 +126,10 @@ def initialize_database(db_path: Path) -> None:
                 FOREIGN KEY (emp_id) REFERENCES Employees(id),
                 FOREIGN KEY (user_id) REFERENCES Users(id)
             );
+
+            -- Users.username is already indexed through its UNIQUE constraint.
+            CREATE INDEX IF NOT EXISTS idx_payraise_user ON EmpPayRaise(user_id, id DESC);
+            CREATE INDEX IF NOT EXISTS idx_payraise_emp ON EmpPayRaise(emp_id);
             """
         )
 
@@ -125,63 +175,79 @@ def initialize_database(db_path: Path) -> None:
             },
         ]
 
-        for entry in employees:
-            # Insert employee if missing.
-            emp = entry["employee"]
-            cur = conn.execute(
-                "SELECT id FROM Employees WHERE name = ? AND email = ?",
-                (emp["name"], emp["email"]),
-            )
-            emp_row = cur.fetchone()
-            if emp_row:
-                emp_id = emp_row[0]
-            else:
-                cur = conn.execute(
-                    """
-                    INSERT INTO Employees (name, email, department, security_level)
-                    VALUES (?, ?, ?, ?)
-                    """,
-                    (emp["name"], emp["email"], emp["department"], emp["security_level"]),
+        # Insert any missing employees in one batch.
+        conn.executemany(
+            """
+            INSERT INTO Employees (name, email, department, security_level)
+            SELECT ?, ?, ?, ?
+            WHERE NOT EXISTS (SELECT 1 FROM Employees WHERE name = ? AND email = ?)
+            """,
+            [
+                (
+                    entry["employee"]["name"],
+                    entry["employee"]["email"],
+                    entry["employee"]["department"],
+                    entry["employee"]["security_level"],
+                    entry["employee"]["name"],
+                    entry["employee"]["email"],
                 )
-                emp_id = cur.lastrowid
+                for entry in employees
+            ],
+        )
+        names = [entry["employee"]["name"] for entry in employees]
+        name_placeholders = ",".join("?" * len(names))
+        cur = conn.execute(
+            f"SELECT id, name, email FROM Employees WHERE name IN ({name_placeholders}) ORDER BY id DESC",
+            names,
+        )
+        # Rows arrive newest first, so the oldest duplicate wins in the mapping.
+        emp_ids = {(name, email): emp_id for emp_id, name, email in cur.fetchall()}
 
-            # Insert user if missing.
-            cur = conn.execute(
-                "SELECT id FROM Users WHERE username = ?",
-                (entry["username"],),
-            )
-            user_row = cur.fetchone()
-            if user_row:
-                user_id = user_row[0]
-            else:
-                password_hash = generate_password_hash(entry["password"])
-                cur = conn.execute(
-                    """
-                    INSERT INTO Users (username, password_hash, full_name, security_level, emp_id)
-                    VALUES (?, ?, ?, ?, ?)
-                    """,
-                    (
-                        entry["username"],
-                        password_hash,
-                        entry["full_name"],
-                        entry["security_level"],
-                        emp_id,
-                    ),
+        # Only hash passwords for users that do not exist yet.
+        usernames = [entry["username"] for entry in employees]
+        username_placeholders = ",".join("?" * len(usernames))
+        cur = conn.execute(
+            f"SELECT username FROM Users WHERE username IN ({username_placeholders})",
+            usernames,
+        )
+        existing_users = {row[0] for row in cur.fetchall()}
+        new_users = [entry for entry in employees if entry["username"] not in existing_users]
+        password_hashes: list[str] = []
+        if new_users:
+            # Password hashing is CPU-bound, so spread it across processes.
+            with ProcessPoolExecutor() as executor:
+                password_hashes = list(
+                    executor.map(generate_password_hash, [entry["password"] for entry in new_users])
+                )
+        conn.executemany(
+            """
+            INSERT INTO Users (username, password_hash, full_name, security_level, emp_id)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            [
+                (
+                    entry["username"],
+                    password_hash,
+                    entry["full_name"],
+                    entry["security_level"],
+                    emp_ids[(entry["employee"]["name"], entry["employee"]["email"])],
                 )
-                user_id = cur.lastrowid
+                for entry, password_hash in zip(new_users, password_hashes)
+            ],
+        )
 
-            # Ensure the relationship is linked even if user existed earlier.
-            conn.execute(
-                "UPDATE Users SET emp_id = ? WHERE id = ?",
-                (emp_id, user_id),
-            )
-            conn.commit()
+        # Ensure the relationship is linked even if users existed earlier.
+        conn.executemany(
+            "UPDATE Users SET emp_id = ? WHERE username = ?",
+            [
+                (emp_ids[(entry["employee"]["name"], entry["employee"]["email"])], entry["username"])
+                for entry in employees
+            ],
+        )
 
         # Seed an example pay raise for the admin user if none exist.
-        cur = conn.execute("SELECT id FROM Users WHERE username = ?", ("admin1",))
-        admin_user_id = cur.fetchone()[0]
-        cur = conn.execute("SELECT emp_id FROM Users WHERE id = ?", (admin_user_id,))
-        admin_emp_id = cur.fetchone()[0]
+        cur = conn.execute("SELECT id, emp_id FROM Users WHERE username = ?", ("admin1",))
+        admin_user_id, admin_emp_id = cur.fetchone()
 
         cur = conn.execute(
             "SELECT COUNT(*) FROM EmpPayRaise WHERE user_id = ?",
@@ -209,7 +275,11 @@ def initialize_database(db_path: Path) -> None:
                     encrypt_text("Annual merit increase"),
                 ),
             )
-            conn.commit()
+
+        # One-time upgrade of rows encrypted before the switch to AES-GCM.
+        migrate_legacy_ciphertexts(conn)
+
+        conn.commit()
 
 
 def main() -> None:
@@ -7,197 +7,405 @@ Module 11: Build Role Based Access Control
 
 Due Sunday September 9
 
-explanation of file: SQLite data helpers with Fernet encryption support.
+explanation of file: SQLite data helpers with field encryption support.
 """
 
+import atexit
+import queue
 import sqlite3
-from typing import Any, Dict, List, Optional
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
 
 from utils import decrypt_text, encrypt_text, get_project_root
 
 
+# Resolved once at import; the project root does not move at runtime.
+_DB_PATH = str(get_project_root() / "app.db")
+
+
 def _db_path() -> str:
     """
-    Construct the absolute path to the SQLite database file.
+    Return the absolute path to the SQLite database file.
     """
-    return str(get_project_root() / "app.db")
+    return _DB_PATH
 
 
-def _get_connection() -> sqlite3.Connection:
+# Each thread holds at most one checked-out connection until release_connection()
+# hands it back to a bounded idle pool. Nothing else references a checked-out
+# connection, so one left behind by a finished thread is closed with its locals.
+# Under gevent, threading.local is per greenlet, so concurrent requests never
+# share a connection.
+_TLS = threading.local()
+_POOL_SIZE = 8
+_IDLE_CONNECTIONS: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=_POOL_SIZE)
+
+
+def _open_connection() -> sqlite3.Connection:
     """
-    Establish a new SQLite connection using row factory for dict-like access.
+    Open a new autocommit SQLite connection with row factory for dict-like access.
     """
-    conn = sqlite3.connect(_db_path())
+    conn = sqlite3.connect(_db_path(), check_same_thread=False, isolation_level=None)
     conn.row_factory = sqlite3.Row
+    # Configure once per pooled connection in a single script.
+    conn.executescript(
+        """
+        PRAGMA journal_mode=WAL;
+        PRAGMA synchronous=NORMAL;
+        PRAGMA foreign_keys=ON;
+        PRAGMA mmap_size=268435456;
+        PRAGMA temp_store=MEMORY;
+        PRAGMA cache_size=-20000;
+        """
+    )
+    return conn
+
+
+def _get_connection() -> sqlite3.Connection:
+    """
+    Return this thread's SQLite connection, reusing an idle pooled one if possible.
+    """
+    conn = getattr(_TLS, "conn", None)
+    if conn is None:
+        try:
+            conn = _IDLE_CONNECTIONS.get_nowait()
+        except queue.Empty:
+            conn = _open_connection()
+        _TLS.conn = conn
     return conn
 
 
+def release_connection() -> None:
+    """
+    Return this thread's connection to the idle pool, closing it if the pool is full.
+    Call at the end of each request so short-lived threads do not hold connections.
+    """
+    conn = getattr(_TLS, "conn", None)
+    if conn is None:
+        return
+    _TLS.conn = None
+    if conn.in_transaction:
+        conn.rollback()
+    try:
+        _IDLE_CONNECTIONS.put_nowait(conn)
+    except queue.Full:
+        conn.close()
+
+
+def _close_pooled_connections() -> None:
+    """
+    Close every idle pooled connection when the interpreter exits.
+    """
+    while True:
+        try:
+            _IDLE_CONNECTIONS.get_nowait().close()
+        except queue.Empty:
+            return
+
+
+atexit.register(_close_pooled_connections)
+
+# Pay raise writes run on one background thread so the request can return before
+# encryption and the commit finish. A clean interpreter exit waits for queued
+# writes; writes still queued when the process is killed are lost.
+_WRITE_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="payraise-writer")
+
+# Small TTL + LRU cache of user rows so repeated logins skip SQLite.
+_USER_CACHE_TTL = 60.0
+_USER_CACHE_MAXSIZE = 1024
+_USER_CACHE: "OrderedDict[str, Tuple[sqlite3.Row, float]]" = OrderedDict()
+_USER_CACHE_LOCK = threading.Lock()
+
+
+class Employee(NamedTuple):
+    """
+    Read-only employee record; attribute access works directly in templates.
+    """
+
+    id: int
+    name: str
+    email: Optional[str]
+    department: Optional[str]
+    security_level: Optional[int]
+
+
+def _format_amount(amount: str) -> str:
+    """
+    Format a decrypted raise amount for display, falling back to the raw value.
+    """
+    try:
+        return f"${float(amount):,.2f}"
+    except ValueError:
+        return amount
+
+
 def get_user_by_username(username: str) -> Optional[sqlite3.Row]:
     """
     Fetch a single user row by username.
+    Found rows are cached briefly; unknown usernames always query the database.
     """
-    with _get_connection() as conn:
-        cur = conn.execute(
-            "SELECT id, username, password_hash, full_name, security_level, emp_id FROM Users WHERE username = ?",
-            (username,),
-        )
-        return cur.fetchone()
+    now = time.monotonic()
+    with _USER_CACHE_LOCK:
+        cached = _USER_CACHE.get(username)
+        if cached is not None and cached[1] > now:
+            _USER_CACHE.move_to_end(username)
+            return cached[0]
+
+    conn = _get_connection()
+    cur = conn.execute(
+        "SELECT id, username, password_hash, full_name, security_level, emp_id FROM Users WHERE username = ?",
+        (username,),
+    )
+    row = cur.fetchone()
+    if row is not None:
+        with _USER_CACHE_LOCK:
+            _USER_CACHE[username] = (row, now + _USER_CACHE_TTL)
+            _USER_CACHE.move_to_end(username)
+            if len(_USER_CACHE) > _USER_CACHE_MAXSIZE:
+                _USER_CACHE.popitem(last=False)
+    return row
 
 
 def get_user_by_id(user_id: int) -> Optional[sqlite3.Row]:
     """
     Fetch a single user row by primary key.
     """
-    with _get_connection() as conn:
-        cur = conn.execute(
-            "SELECT id, username, password_hash, full_name, security_level, emp_id FROM Users WHERE id = ?",
-            (user_id,),
-        )
-        return cur.fetchone()
+    conn = _get_connection()
+    cur = conn.execute(
+        "SELECT id, username, password_hash, full_name, security_level, emp_id FROM Users WHERE id = ?",
+        (user_id,),
+    )
+    return cur.fetchone()
 
 
 def create_user(username: str, password_hash: str, full_name: str, security_level: int) -> int:
     """
     Insert a new user into the Users table.
     """
-    with _get_connection() as conn:
-        cur = conn.execute(
-            """
-            INSERT INTO Users (username, password_hash, full_name, security_level)
-            VALUES (?, ?, ?, ?)
-            """,
-            (username, password_hash, full_name, security_level),
-        )
-        conn.commit()
-        return cur.lastrowid
+    conn = _get_connection()
+    cur = conn.execute(
+        """
+        INSERT INTO Users (username, password_hash, full_name, security_level)
+        VALUES (?, ?, ?, ?)
+        """,
+        (username, password_hash, full_name, security_level),
+    )
+    conn.commit()
+    with _USER_CACHE_LOCK:
+        _USER_CACHE.pop(username, None)
+    return cur.lastrowid
 
 
-def get_employees() -> List[Dict[str, Any]]:
+def get_employees() -> List[Employee]:
     """
     Retrieve all employees.
     """
-    with _get_connection() as conn:
-        cur = conn.execute(
-            "SELECT id, name, email, department, security_level FROM Employees ORDER BY name"
-        )
-        return [dict(row) for row in cur.fetchall()]
+    conn = _get_connection()
+    # Build tuples straight from positional rows instead of a dict per row.
+    cur = conn.cursor()
+    cur.row_factory = None
+    cur.execute(
+        "SELECT id, name, email, department, security_level FROM Employees ORDER BY name"
+    )
+    return list(map(Employee._make, cur.fetchall()))
 
 
 def get_emp_by_id(emp_id: int) -> Optional[Dict[str, Any]]:
     """
     Retrieve a single employee by ID.
     """
-    with _get_connection() as conn:
-        cur = conn.execute(
-            "SELECT id, name, email, department, security_level FROM Employees WHERE id = ?",
-            (emp_id,),
-        )
-        row = cur.fetchone()
-        return dict(row) if row else None
+    conn = _get_connection()
+    cur = conn.execute(
+        "SELECT id, name, email, department, security_level FROM Employees WHERE id = ?",
+        (emp_id,),
+    )
+    row = cur.fetchone()
+    return dict(row) if row else None
 
 
 def create_employee(name: str, email: str, department: str, security_level: int) -> int:
     """
     Insert a new employee record.
     """
-    with _get_connection() as conn:
-        cur = conn.execute(
-            """
-            INSERT INTO Employees (name, email, department, security_level)
-            VALUES (?, ?, ?, ?)
-            """,
-            (name, email, department, security_level),
+    conn = _get_connection()
+    cur = conn.execute(
+        """
+        INSERT INTO Employees (name, email, department, security_level)
+        VALUES (?, ?, ?, ?)
+        """,
+        (name, email, department, security_level),
+    )
+    conn.commit()
+    return cur.lastrowid
+
+
+def _insert_payraise(
+    user_id: int, emp_id: int, date_str: str, amount: str, comments: Optional[str]
+) -> int:
+    """
+    Encrypt and insert a single pre-validated pay raise record, returning its new ID.
+    """
+    # Prepare encrypted values as bytes before storing.
+    encrypted_date = encrypt_text(date_str)
+    encrypted_amt = encrypt_text(amount)
+    encrypted_comments = encrypt_text(comments) if comments else None
+
+    conn = _get_connection()
+    cur = conn.execute(
+        """
+        INSERT INTO EmpPayRaise (
+            emp_id, user_id, payraise_date_encrypted, raiseamt_encrypted, comments_encrypted
         )
-        conn.commit()
-        return cur.lastrowid
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        (emp_id, user_id, encrypted_date, encrypted_amt, encrypted_comments),
+    )
+    conn.commit()
+    return cur.lastrowid
 
 
-def create_payraise(user_id: int, emp_id: int, date_str: str, raise_amt: float, comments: Optional[str] = None) -> int:
+def create_payraise(
+    user_id: int, emp_id: int, date_str: str, raise_amt: float, comments: Optional[str] = None
+) -> "Future[int]":
     """
-    Insert a new pay raise record with encrypted fields.
+    Queue a new pay raise record with encrypted fields for the background writer.
     Comments are optional and encrypted when provided to keep sensitive notes private.
+    Input and the employee/user references are checked before queueing, so a
+    ValueError is raised here rather than the background insert failing later.
+    Returns a future resolving to the new record ID once it is committed.
     """
-    # Prepare encrypted values as bytes before storing.
-    encrypted_date = encrypt_text(date_str.strip())
-    encrypted_amt = encrypt_text(f"{float(raise_amt):.2f}")
-    encrypted_comments = encrypt_text(comments.strip()) if comments else None
+    amount = f"{float(raise_amt):.2f}"
+    conn = _get_connection()
+    emp_exists, user_exists = conn.execute(
+        "SELECT EXISTS(SELECT 1 FROM Employees WHERE id = ?), EXISTS(SELECT 1 FROM Users WHERE id = ?)",
+        (emp_id, user_id),
+    ).fetchone()
+    if not emp_exists:
+        raise ValueError("Employee record not found.")
+    if not user_exists:
+        raise ValueError("User record not found.")
+
+    return _WRITE_EXECUTOR.submit(
+        _insert_payraise,
+        user_id,
+        emp_id,
+        date_str.strip(),
+        amount,
+        comments.strip() if comments else None,
+    )
+
+
+def create_payraises_bulk(rows: Iterable[Mapping[str, Any]]) -> int:
+    """
+    Insert many pay raise records in a single transaction.
+    Each row carries the same fields as create_payraise's keyword arguments.
+    Returns the number of rows inserted.
+    """
+    enc = encrypt_text
+    payload = [
+        (
+            row["emp_id"],
+            row["user_id"],
+            enc(row["date_str"].strip()),
+            enc(f"{float(row['raise_amt']):.2f}"),
+            enc(row["comments"].strip()) if row.get("comments") else None,
+        )
+        for row in rows
+    ]
 
-    with _get_connection() as conn:
-        cur = conn.execute(
+    conn = _get_connection()
+    conn.execute("BEGIN")
+    try:
+        conn.executemany(
             """
             INSERT INTO EmpPayRaise (
                 emp_id, user_id, payraise_date_encrypted, raiseamt_encrypted, comments_encrypted
             )
             VALUES (?, ?, ?, ?, ?)
             """,
-            (emp_id, user_id, encrypted_date, encrypted_amt, encrypted_comments),
+            payload,
         )
-        conn.commit()
-        return cur.lastrowid
+    except BaseException:
+        # Never leave the pooled autocommit connection inside an open transaction.
+        conn.rollback()
+        raise
+    conn.commit()
+    return len(payload)
 
 
 def get_payraises_for_user(user_id: int) -> List[Dict[str, Any]]:
     """
     Retrieve decrypted pay raise records for a specific user.
     """
-    with _get_connection() as conn:
-        cur = conn.execute(
-            """
-            SELECT e.name AS employee_name,
-                   pr.payraise_date_encrypted,
-                   pr.raiseamt_encrypted,
-                   pr.comments_encrypted
-            FROM EmpPayRaise pr
-            JOIN Employees e ON e.id = pr.emp_id
-            WHERE pr.user_id = ?
-            ORDER BY pr.id DESC
-            """,
-            (user_id,),
-        )
-        results = []
-        for row in cur.fetchall():
-            decrypted_row = {
-                "employee_name": row["employee_name"],
-                "payraise_date": decrypt_text(row["payraise_date_encrypted"]),
-                "raise_amount": decrypt_text(row["raiseamt_encrypted"]),
-                "comments": decrypt_text(row["comments_encrypted"])
-                if row["comments_encrypted"]
-                else "",
+    dec = decrypt_text
+    conn = _get_connection()
+    # Positional tuples avoid sqlite3.Row overhead on this hot path.
+    cur = conn.cursor()
+    cur.row_factory = None
+    cur.execute(
+        """
+        SELECT e.name AS employee_name,
+               pr.payraise_date_encrypted,
+               pr.raiseamt_encrypted,
+               pr.comments_encrypted
+        FROM EmpPayRaise pr
+        JOIN Employees e ON e.id = pr.emp_id
+        WHERE pr.user_id = ?
+        ORDER BY pr.id DESC
+        """,
+        (user_id,),
+    )
+    results = []
+    for r in cur.fetchall():
+        amount = dec(r[2])
+        results.append(
+            {
+                "employee_name": r[0],
+                "payraise_date": dec(r[1]),
+                "raise_amount": amount,
+                "raise_amount_display": _format_amount(amount),
+                "comments": dec(r[3]) if r[3] else "",
             }
-            results.append(decrypted_row)
-        return results
+        )
+    return results
 
 
 def get_all_payraises() -> List[Dict[str, Any]]:
     """
     Retrieve all pay raises with decrypted values for authorized viewing.
     """
-    with _get_connection() as conn:
-        cur = conn.execute(
-            """
-            SELECT pr.id,
-                   e.name AS employee_name,
-                   pr.user_id,
-                   pr.payraise_date_encrypted,
-                   pr.raiseamt_encrypted,
-                   pr.comments_encrypted
-            FROM EmpPayRaise pr
-            JOIN Employees e ON e.id = pr.emp_id
-            ORDER BY pr.id DESC
-            """
-        )
-        results = []
-        for row in cur.fetchall():
-            decrypted_row = {
-                "id": row["id"],
-                "employee_name": row["employee_name"],
-                "user_id": row["user_id"],
-                "payraise_date": decrypt_text(row["payraise_date_encrypted"]),
-                "raise_amount": decrypt_text(row["raiseamt_encrypted"]),
-                "comments": decrypt_text(row["comments_encrypted"])
-                if row["comments_encrypted"]
-                else "",
+    dec = decrypt_text
+    conn = _get_connection()
+    # Positional tuples avoid sqlite3.Row overhead on this hot path.
+    cur = conn.cursor()
+    cur.row_factory = None
+    cur.execute(
+        """
+        SELECT pr.id,
+               e.name AS employee_name,
+               pr.user_id,
+               pr.payraise_date_encrypted,
+               pr.raiseamt_encrypted,
+               pr.comments_encrypted
+        FROM EmpPayRaise pr
+        JOIN Employees e ON e.id = pr.emp_id
+        ORDER BY pr.id DESC
+        """
+    )
+    results = []
+    for r in cur.fetchall():
+        amount = dec(r[4])
+        results.append(
+            {
+                "id": r[0],
+                "employee_name": r[1],
+                "user_id": r[2],
+                "payraise_date": dec(r[3]),
+                "raise_amount": amount,
+                "raise_amount_display": _format_amount(amount),
+                "comments": dec(r[5]) if r[5] else "",
             }
-            results.append(decrypted_row)
-        return results
-
+        )
+    return results
@@ -10,21 +10,39 @@ Due Sunday September 9
 explanation of file: Cryptographic utilities and validation helpers.
 """
 
+import base64
+import functools
 import os
 import pathlib
+import re
 from datetime import datetime
-from typing import Optional
+from typing import Callable, Optional
 
 from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 
-# Module-level cache so we do not reload the key repeatedly.
-_FERNET_INSTANCE: Optional[Fernet] = None
+# Ciphertext layout: version byte, 12-byte nonce, AES-GCM ciphertext and tag.
+# Fernet tokens always start with "g", so the version byte tells the formats apart.
+_GCM_VERSION = b"\x01"
+_NONCE_SIZE = 12
+_HKDF_INFO = b"secure-flask-portal field encryption"
 
+# Bound AES-GCM methods, assigned on first use so the hot path skips lookups.
+_ENCRYPT: Optional[Callable[[bytes, bytes, Optional[bytes]], bytes]] = None
+_DECRYPT: Optional[Callable[[bytes, bytes, Optional[bytes]], bytes]] = None
 
+# Shape check for YYYY-MM-DD, compiled once instead of parsing a format per call.
+_DATE_RE = re.compile(r"^(\d{4})-(\d{2})-(\d{2})$", re.ASCII)
+
+
+@functools.lru_cache(maxsize=1)
 def get_project_root() -> pathlib.Path:
     """
     Return the absolute path of the project root directory.
     This helper supports locating files while keeping code tidy.
+    The result is cached since resolving the path touches the filesystem.
     """
     return pathlib.Path(__file__).resolve().parent
 
@@ -54,45 +72,80 @@ def _load_fernet_key() -> bytes:
     )
 
 
+@functools.lru_cache(maxsize=1)
 def get_fernet() -> Fernet:
     """
-    Return a singleton Fernet instance, loading the key as needed.
+    Return a singleton Fernet instance for reading rows written before AES-GCM.
+    """
+    return Fernet(_load_fernet_key())
+
+
+@functools.lru_cache(maxsize=1)
+def get_aesgcm() -> AESGCM:
+    """
+    Return a singleton AES-GCM cipher keyed from the configured Fernet key.
+    HKDF derives a separate key so the Fernet key material is not reused directly.
+    """
+    master_key = base64.urlsafe_b64decode(_load_fernet_key())
+    hkdf = HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=_HKDF_INFO)
+    return AESGCM(hkdf.derive(master_key))
+
+
+def _bind_cipher() -> None:
+    """
+    Bind the singleton's encrypt/decrypt methods to module globals.
+    """
+    global _ENCRYPT, _DECRYPT
+    aesgcm = get_aesgcm()
+    _ENCRYPT = aesgcm.encrypt
+    _DECRYPT = aesgcm.decrypt
+
+
+def is_legacy_ciphertext(cipher: bytes) -> bool:
+    """
+    Report whether the ciphertext is a Fernet token from before the AES-GCM switch.
     """
-    global _FERNET_INSTANCE
-    if _FERNET_INSTANCE is None:
-        _FERNET_INSTANCE = Fernet(_load_fernet_key())
-    return _FERNET_INSTANCE
+    return cipher[:1] != _GCM_VERSION
 
 
 def encrypt_text(plain: str) -> bytes:
     """
     Encrypt the provided plain-text string, returning ciphertext bytes.
+    Callers are expected to strip input before encrypting.
     """
     if plain is None:
         raise ValueError("Cannot encrypt None value.")
-    fernet = get_fernet()
-    # Fernet expects bytes; encode using UTF-8.
-    return fernet.encrypt(plain.strip().encode("utf-8"))
+    if _ENCRYPT is None:
+        _bind_cipher()
+    # A fresh random nonce per message is required for AES-GCM security.
+    nonce = os.urandom(_NONCE_SIZE)
+    return _GCM_VERSION + nonce + _ENCRYPT(nonce, plain.encode("utf-8"), None)
 
 
 def decrypt_text(cipher: bytes) -> str:
     """
     Decrypt ciphertext bytes back into a UTF-8 string.
+    Legacy Fernet tokens are still accepted until init_db.py migrates them.
     """
     if cipher is None:
         raise ValueError("Cannot decrypt None value.")
-    fernet = get_fernet()
-    return fernet.decrypt(cipher).decode("utf-8")
+    if cipher[:1] != _GCM_VERSION:
+        return get_fernet().decrypt(cipher).decode("utf-8")
+    if _DECRYPT is None:
+        _bind_cipher()
+    return _DECRYPT(cipher[1 : 1 + _NONCE_SIZE], cipher[1 + _NONCE_SIZE :], None).decode("utf-8")
 
 
 def is_valid_date(date_str: str) -> bool:
     """
     Validate that the supplied string is a non-empty date in YYYY-MM-DD format.
     """
-    if not date_str or not date_str.strip():
+    match = _DATE_RE.match(date_str.strip() if date_str else "")
+    if not match:
         return False
     try:
-        datetime.strptime(date_str.strip(), "%Y-%m-%d")
+        # Constructing the date catches out-of-range months and days.
+        datetime(int(match[1]), int(match[2]), int(match[3]))
         return True
     except ValueError:
         return False